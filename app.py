@@ -1,7 +1,28 @@
+# Make blocking I/O (requests, sockets, threads) cooperative before anything
+# else imports it; the hot path is almost entirely waiting on upstream HTTP
+from gevent import monkey
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()
+
 import os
+import atexit
+import hashlib
 import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import orjson
+import pybreaker
 import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -14,8 +35,18 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for request parsing and jsonify()"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Create the app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("SESSION_SECRET")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 CORS(app)
@@ -26,16 +57,36 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     'pool_pre_ping': True,
     "pool_recycle": 300,
+    "query_cache_size": 1200,
+    # Sized for many concurrent greenlets per gevent worker
+    "pool_size": 20,
+    "max_overflow": 40,
 }
 
 db = SQLAlchemy(app, model_class=Base)
 
-# Create tables - Need to put this here to make it work with Gunicorn
-with app.app_context():
-    import models  # noqa: F401
+from models import RECENT_TRANSLATIONS, SCHEMA_INDEXES, SCHEMA_UPGRADES, Translation
+
+# Tables are created once per deploy with `flask --app app init-db` rather
+# than by every gunicorn worker on boot
+@app.cli.command('init-db')
+def init_db():
+    """Create any missing database tables and apply SCHEMA_UPGRADES and SCHEMA_INDEXES"""
     db.create_all()
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as connection:
+            for statement in SCHEMA_UPGRADES:
+                connection.execute(db.text(statement))
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for statement in SCHEMA_INDEXES:
+                connection.execute(db.text(statement))
     logging.info("Database tables created")
 
+# Local development shortcut
+if os.environ.get('FLASK_INIT_DB'):
+    with app.app_context():
+        db.create_all()
+
 # Import auth components
 from replit_auth import make_replit_blueprint
 
@@ -47,9 +98,181 @@ app.register_blueprint(make_replit_blueprint(), url_prefix="/auth")
 def make_session_permanent():
     session.permanent = True
 
+# Translation history is written by a background thread in batches, so
+# /translate responds without waiting on the database
+HISTORY_QUEUE = queue.Queue()
+HISTORY_BATCH_SIZE = 50
+HISTORY_FLUSH_INTERVAL = 0.2
+
+def write_history(batch):
+    """Insert a batch of translation history rows in a single round-trip"""
+    with app.app_context():
+        try:
+            db.session.bulk_insert_mappings(Translation, batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Failed to save translation history: {str(e)}")
+
+# Put on the queue by flush_history to tell the writer to finish up and exit
+HISTORY_STOP = object()
+
+def history_writer():
+    """Drain HISTORY_QUEUE, flushing every HISTORY_FLUSH_INTERVAL seconds or HISTORY_BATCH_SIZE rows,
+    until HISTORY_STOP is taken off the queue"""
+    while True:
+        item = HISTORY_QUEUE.get()
+        if item is HISTORY_STOP:
+            return
+        batch = [item]
+        deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+        while len(batch) < HISTORY_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = HISTORY_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is HISTORY_STOP:
+                write_history(batch)
+                return
+            batch.append(item)
+        write_history(batch)
+
+def start_history_writer():
+    """Start the background thread that writes queued history rows"""
+    global HISTORY_WRITER
+    HISTORY_WRITER = threading.Thread(target=history_writer, name='history-writer', daemon=True)
+    HISTORY_WRITER.start()
+
+def flush_history(timeout=5):
+    """Stop the writer once it has written every row queued so far, including a batch
+    it has already taken off the queue. Rows are lost only if the database doesn't
+    accept them within `timeout` seconds."""
+    HISTORY_QUEUE.put(HISTORY_STOP)
+    HISTORY_WRITER.join(timeout)
+
+start_history_writer()
+atexit.register(flush_history)
+
 # Translation APIs configuration
 MYMEMORY_API_URL = "https://api.mymemory.translated.net/get"
 LIBRETRANSLATE_API_URL = "https://libretranslate.com/translate"
+LIBRETRANSLATE_API_KEY = os.environ.get("LIBRETRANSLATE_API_KEY")
+
+# Request parts that don't depend on the text are built once at import
+MYMEMORY_PARAMS = {'langpair': 'en|as'}  # English to Assamese
+LIBRE_PAYLOAD = {
+    'source': 'en',
+    'target': 'as',
+    'format': 'text'
+}
+LIBRE_HEADERS = {'Content-Type': 'application/json'}
+if LIBRETRANSLATE_API_KEY:
+    LIBRE_HEADERS['Authorization'] = f'Bearer {LIBRETRANSLATE_API_KEY}'
+
+class CircuitBreaker(pybreaker.CircuitBreaker):
+    """pybreaker.CircuitBreaker that doesn't hold its lock while a closed-circuit call runs.
+
+    The stock call() keeps the breaker's lock for the whole upstream request, which
+    would let only one request per provider be in flight at a time. Once the circuit
+    has opened, calls go through a non-blocking trial lock instead, so after
+    reset_timeout exactly one trial call reaches the upstream and every concurrent
+    caller gets CircuitBreakerError until that trial has closed or reopened it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Reentrant because the open state re-enters call() after moving to half-open
+        self._trial_lock = threading.RLock()
+
+    def call(self, func, *args, **kwargs):
+        state = self.state
+        if state.name == pybreaker.STATE_CLOSED:
+            return state.call(func, *args, **kwargs)
+        
+        if not self._trial_lock.acquire(blocking=False):
+            raise pybreaker.CircuitBreakerError("Trial call in progress, circuit breaker still open")
+        try:
+            return self.state.call(func, *args, **kwargs)
+        finally:
+            self._trial_lock.release()
+
+# Circuit breakers: after repeated upstream failures, skip the provider for a
+# while instead of blocking on its timeout for every request. The call that
+# trips a breaker re-raises its real error so a timeout is still reported as one.
+MYMEMORY_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30, throw_new_error_on_trip=False, name='MyMemory')
+LIBRE_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30, throw_new_error_on_trip=False, name='LibreTranslate')
+
+# Retry transient upstream failures (rate limiting, gateway errors, refused
+# connections) with exponential backoff; the jitter keeps workers from retrying
+# in lockstep. Client errors such as 400/401/403/404/422 are never retried.
+# The budget has to fit inside the race deadline (PROVIDER_TIMEOUT), so read
+# timeouts are not retried, connection failures are retried once and no single
+# wait, including one asked for by Retry-After, is longer than a second.
+RETRY_AFTER_MAX = 1
+
+class CappedRetry(Retry):
+    """Retry that honours Retry-After but never sleeps longer than RETRY_AFTER_MAX"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, RETRY_AFTER_MAX)
+
+RETRY = CappedRetry(
+    total=2,
+    connect=1,
+    read=False,
+    other=0,
+    status=2,
+    backoff_factor=0.5,
+    backoff_max=RETRY_AFTER_MAX,
+    backoff_jitter=0.3,
+    status_forcelist=[429, 502, 503, 504],
+    allowed_methods=["GET", "POST"],
+    respect_retry_after_header=True,
+)
+
+# Providers are queried concurrently; the first usable answer wins. Under gevent
+# the pool's threads are greenlets, so it is sized to the worker's connection
+# budget (one call per provider per in-flight request) rather than to CPUs.
+WORKER_CONNECTIONS = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+PROVIDER_WORKERS = 2 * WORKER_CONNECTIONS
+EXECUTOR = ThreadPoolExecutor(max_workers=PROVIDER_WORKERS, thread_name_prefix='translate')
+PROVIDER_TIMEOUT = 10
+# Fail fast on unreachable hosts so the other provider can win the race
+CONNECT_TIMEOUT = 3.05
+
+# Shared HTTP session so upstream TCP/TLS connections are kept alive and reused.
+# There is one pool per upstream host, keeping up to KEEPALIVE_CONNECTIONS idle
+# connections. During a burst, calls beyond that open a short-lived connection
+# that is closed after use. We don't block on the pool (pool_block=True) because
+# requests gives that wait no timeout, so a queued call could outlive the race
+# deadline. Concurrent upstream calls are already limited by the worker's
+# in-flight requests.
+KEEPALIVE_CONNECTIONS = 20
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=KEEPALIVE_CONNECTIONS,
+    pool_block=False,
+    max_retries=RETRY,
+))
+
+# MyMemory rejects long queries, so longer inputs are split into sentence
+# chunks that are translated in parallel; anything beyond the hard limit is
+# refused before touching the network. Line breaks always end a chunk so the
+# original layout can be put back around the translations.
+MAX_TEXT_LENGTH = 5000
+CHUNK_LENGTH = 500
+SENTENCE_BOUNDARY = re.compile(r'((?<=[.!?])\s+|\s*\n\s*)')
+WORD_BOUNDARY = re.compile(r'(\s+)')
+
+# Successful translations keyed by a digest of the input text, so repeated
+# phrases are answered without another upstream round-trip
+TRANSLATION_CACHE = TTLCache(maxsize=10_000, ttl=3600)
+TRANSLATION_CACHE_LOCK = threading.Lock()
 
 @app.route('/')
 def index():
@@ -62,27 +285,31 @@ def history():
     if not current_user.is_authenticated:
         return redirect(url_for('replit_auth.login'))
     
-    from models import Translation
-    translations = Translation.query.filter_by(user_id=current_user.id).order_by(Translation.created_at.desc()).limit(50).all()
+    translations = db.session.execute(RECENT_TRANSLATIONS, {'uid': current_user.id}).scalars().all()
     
     return render_template('history.html', translations=translations)
 
+def raise_for_server_error(response):
+    """Raise on 5xx so the circuit breaker counts it; 4xx is a bad request, not an outage"""
+    if response.status_code >= 500:
+        response.raise_for_status()
+
+@MYMEMORY_BREAKER
 def translate_with_mymemory(text):
-    """Translate using MyMemory API (free, no API key required)"""
+    """Translate using MyMemory API (free, no API key required)
+
+    Timeouts, connection errors and 5xx responses propagate so the breaker can trip.
+    """
+    response = SESSION.get(
+        MYMEMORY_API_URL,
+        params={**MYMEMORY_PARAMS, 'q': text},
+        timeout=(CONNECT_TIMEOUT, PROVIDER_TIMEOUT)
+    )
+    raise_for_server_error(response)
+    
     try:
-        params = {
-            'q': text,
-            'langpair': 'en|as'  # English to Assamese
-        }
-        
-        response = requests.get(
-            MYMEMORY_API_URL,
-            params=params,
-            timeout=10
-        )
-        
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             if result.get('responseStatus') == 200:
                 translated_text = result.get('responseData', {}).get('translatedText', '')
                 return translated_text.strip() if translated_text else None
@@ -92,30 +319,23 @@ def translate_with_mymemory(text):
         app.logger.error(f"MyMemory API error: {str(e)}")
         return None
 
+@LIBRE_BREAKER
 def translate_with_libretranslate(text):
-    """Translate using LibreTranslate API (requires API key)"""
+    """Translate using LibreTranslate API (requires API key)
+
+    Timeouts, connection errors and 5xx responses propagate so the breaker can trip.
+    """
+    response = SESSION.post(
+        LIBRETRANSLATE_API_URL,
+        json={**LIBRE_PAYLOAD, 'q': text},
+        headers=LIBRE_HEADERS,
+        timeout=(CONNECT_TIMEOUT, PROVIDER_TIMEOUT)
+    )
+    raise_for_server_error(response)
+    
     try:
-        api_key = os.environ.get("LIBRETRANSLATE_API_KEY")
-        translation_data = {
-            'q': text,
-            'source': 'en',
-            'target': 'as',
-            'format': 'text'
-        }
-        
-        headers = {'Content-Type': 'application/json'}
-        if api_key:
-            headers['Authorization'] = f'Bearer {api_key}'
-        
-        response = requests.post(
-            LIBRETRANSLATE_API_URL,
-            json=translation_data,
-            headers=headers,
-            timeout=10
-        )
-        
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             translated_text = result.get('translatedText', '')
             return translated_text.strip() if translated_text else None
         
@@ -124,10 +344,218 @@ def translate_with_libretranslate(text):
         app.logger.error(f"LibreTranslate API error: {str(e)}")
         return None
 
+def call_provider(name, translator, text):
+    """Run a translator, returning None if its circuit is open; upstream errors are
+    logged and re-raised so the caller can tell timeouts from other failures"""
+    try:
+        return translator(text)
+    except pybreaker.CircuitBreakerError:
+        app.logger.warning(f"{name} circuit is open, skipping")
+        return None
+    except requests.exceptions.RequestException as e:
+        app.logger.error(f"{name} API error: {str(e)}")
+        raise
+
+def raise_for_provider_failures(failures, provider_count):
+    """When every provider failed the same way, raise that so /translate can answer
+    with a 504 for timeouts or a connection error message; otherwise do nothing"""
+    if not failures or len(failures) < provider_count:
+        return
+    if all(isinstance(e, requests.exceptions.Timeout) for e in failures):
+        raise requests.exceptions.Timeout("All translation providers timed out")
+    if all(isinstance(e, requests.exceptions.ConnectionError) for e in failures):
+        raise requests.exceptions.ConnectionError("Unable to reach any translation provider")
+
+# (service name, translator) for every upstream provider
+PROVIDERS = [
+    ('MyMemory', translate_with_mymemory),
+    ('LibreTranslate', translate_with_libretranslate),
+]
+
+def cache_key(text):
+    """Fixed-size cache key so very long inputs don't bloat the cache"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def start_race(text):
+    """Submit text to every provider unless it is already cached.
+
+    Returns a (key, cached_result, futures) tuple for finish_race.
+    """
+    key = cache_key(text)
+    with TRANSLATION_CACHE_LOCK:
+        cached = TRANSLATION_CACHE.get(key)
+    if cached:
+        return key, cached, {}
+    
+    futures = {
+        EXECUTOR.submit(call_provider, name, translator, text): name
+        for name, translator in PROVIDERS
+    }
+    return key, None, futures
+
+def finish_race(race, deadline):
+    """Wait until `deadline` (a time.monotonic() value) for the first provider in a
+    started race to succeed, and return (translated_text, service) or (None, None).
+
+    Raises requests' Timeout or ConnectionError when every provider failed that way.
+    """
+    key, cached, futures = race
+    if cached:
+        return cached
+    
+    failures = []
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+            pending.discard(future)
+            try:
+                translated_text = future.result()
+            except requests.exceptions.RequestException as e:
+                failures.append(e)
+                continue
+            if translated_text:
+                result = (translated_text, futures[future])
+                with TRANSLATION_CACHE_LOCK:
+                    TRANSLATION_CACHE[key] = result
+                return result
+    except FuturesTimeoutError:
+        app.logger.warning("Translation providers did not respond in time")
+        failures.extend(requests.exceptions.Timeout() for _ in pending)
+    finally:
+        # Don't leave queued work behind for a caller that has already answered
+        for future in pending:
+            future.cancel()
+    
+    raise_for_provider_failures(failures, len(futures))
+    return None, None
+
+def race_providers(text):
+    """Query every provider and return (translated_text, service) for the first one that
+    succeeds, or (None, None) if none did in time. A provider whose circuit is open
+    is rejected by its breaker without a network call until reset_timeout passes.
+
+    Raises requests' Timeout or ConnectionError when every provider failed that way.
+    """
+    return finish_race(start_race(text), time.monotonic() + PROVIDER_TIMEOUT)
+
+def split_into_units(text):
+    """Split text into (segment, separator) pairs at sentence ends and line breaks,
+    breaking any segment longer than CHUNK_LENGTH on whitespace, so that joining
+    segment + separator for every pair gives back the original text"""
+    units = []
+    parts = SENTENCE_BOUNDARY.split(text)
+    for sentence, separator in zip(parts[::2], parts[1::2] + ['']):
+        if len(sentence) <= CHUNK_LENGTH:
+            units.append((sentence, separator))
+            continue
+        words = WORD_BOUNDARY.split(sentence)
+        for word, word_separator in zip(words[::2], words[1::2] + [separator]):
+            while len(word) > CHUNK_LENGTH:
+                units.append((word[:CHUNK_LENGTH], ''))
+                word = word[CHUNK_LENGTH:]
+            units.append((word, word_separator))
+    return units
+
+def split_into_chunks(text):
+    """Group sentences into (chunk, separator) pairs of at most CHUNK_LENGTH characters.
+
+    A chunk never spans a line break; the separator is the original whitespace
+    that followed the chunk, so translations can be reassembled in the same layout.
+    """
+    chunks = []
+    current, current_separator = '', ''
+    for segment, separator in split_into_units(text):
+        if not segment:
+            current_separator += separator
+            continue
+        if current and ('\n' in current_separator or not current_separator
+                        or len(current) + len(current_separator) + len(segment) > CHUNK_LENGTH):
+            chunks.append((current, current_separator))
+            current = segment
+        else:
+            current = current + current_separator + segment if current else segment
+        current_separator = separator
+    if current:
+        chunks.append((current, current_separator))
+    return chunks
+
+def translate_chunks(chunks, deadline):
+    """Race every chunk at once against `deadline`; returns one
+    (translated_text, service) result or RequestException per chunk"""
+    races = [start_race(chunk) for chunk in chunks]
+    results = []
+    try:
+        for race in races:
+            try:
+                results.append(finish_race(race, deadline))
+            except requests.exceptions.RequestException as e:
+                results.append(e)
+    finally:
+        for _, _, futures in races:
+            for future in futures:
+                future.cancel()
+    return results
+
+def translate_text(text):
+    """Translate text of any accepted length, returning (translated_text, service)
+    or (None, None) if any part could not be translated.
+
+    Long text is translated chunk by chunk in parallel against one PROVIDER_TIMEOUT
+    deadline. Chunks that every provider answered without a translation get another
+    attempt if time is left; a chunk that timed out or couldn't connect fails the
+    request straight away. Translations are joined with the original whitespace so
+    line breaks and paragraphs survive.
+    """
+    if len(text) <= CHUNK_LENGTH:
+        return race_providers(text)
+    
+    deadline = time.monotonic() + PROVIDER_TIMEOUT
+    chunks = split_into_chunks(text)
+    results = translate_chunks([chunk for chunk, _ in chunks], deadline)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    
+    failed = [i for i, (translated, _) in enumerate(results) if not translated]
+    if failed and time.monotonic() < deadline:
+        app.logger.info(f"Retrying {len(failed)} of {len(chunks)} chunks")
+        for i, result in zip(failed, translate_chunks([chunks[i][0] for i in failed], deadline)):
+            if isinstance(result, Exception):
+                raise result
+            results[i] = result
+    
+    if not all(translated for translated, _ in results):
+        return None, None
+    
+    translated = ''.join(result[0] + separator for result, (_, separator) in zip(results, chunks))
+    services = list(dict.fromkeys(service for _, service in results))
+    return translated, ', '.join(services)
+
+def finalize_translation(original, translated, service, uid):
+    """Queue the history row for logged-in users and build the success response"""
+    if uid:
+        HISTORY_QUEUE.put({
+            'user_id': uid,
+            'original_text': original,
+            'translated_text': translated,
+            'service_used': service
+        })
+    
+    return jsonify({
+        'success': True,
+        'translated_text': translated,
+        'original_text': original,
+        'service': service
+    })
+
 @app.route('/translate', methods=['POST'])
 def translate():
     """Translate text from English to Assamese using multiple translation services"""
     try:
+        # Resolve the logged-in user once instead of going through the proxy per access
+        user = current_user._get_current_object()
+        uid = user.id if user.is_authenticated else None
+        
         data = request.get_json()
         text = data.get('text', '').strip()
         
@@ -137,59 +565,17 @@ def translate():
                 'error': 'Please enter some text to translate'
             }), 400
         
-        # Try MyMemory first (free, no API key needed)
-        app.logger.info("Attempting translation with MyMemory API")
-        translated_text = translate_with_mymemory(text)
-        
-        if translated_text:
-            # Save translation history if user is logged in
-            if current_user.is_authenticated:
-                try:
-                    from models import Translation
-                    translation = Translation(
-                        user_id=current_user.id,
-                        original_text=text,
-                        translated_text=translated_text,
-                        service_used='MyMemory'
-                    )
-                    db.session.add(translation)
-                    db.session.commit()
-                except Exception as e:
-                    app.logger.error(f"Failed to save translation history: {str(e)}")
-                    
+        if len(text) > MAX_TEXT_LENGTH:
             return jsonify({
-                'success': True,
-                'translated_text': translated_text,
-                'original_text': text,
-                'service': 'MyMemory'
-            })
+                'success': False,
+                'error': f'Text is too long. Please keep it under {MAX_TEXT_LENGTH} characters.'
+            }), 400
         
-        # If MyMemory fails, try LibreTranslate (if API key is available)
-        app.logger.info("MyMemory failed, attempting LibreTranslate API")
-        translated_text = translate_with_libretranslate(text)
+        app.logger.info("Querying translation providers")
+        translated_text, service = translate_text(text)
         
         if translated_text:
-            # Save translation history if user is logged in
-            if current_user.is_authenticated:
-                try:
-                    from models import Translation
-                    translation = Translation(
-                        user_id=current_user.id,
-                        original_text=text,
-                        translated_text=translated_text,
-                        service_used='LibreTranslate'
-                    )
-                    db.session.add(translation)
-                    db.session.commit()
-                except Exception as e:
-                    app.logger.error(f"Failed to save translation history: {str(e)}")
-                    
-            return jsonify({
-                'success': True,
-                'translated_text': translated_text,
-                'original_text': text,
-                'service': 'LibreTranslate'
-            })
+            return finalize_translation(text, translated_text, service, uid)
         
         # If all services fail
         return jsonify({
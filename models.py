@@ -1,9 +1,27 @@
-from datetime import datetime
-
 from app import db
 from flask_dance.consumer.storage.sqla import OAuthConsumerMixin
 from flask_login import UserMixin
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import DateTime, UniqueConstraint, bindparam, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class utcnow(FunctionElement):
+    """Database-side current time in UTC, for timestamp columns without a time zone"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def compile_utcnow(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, 'postgresql')
+def compile_utcnow_postgresql(element, compiler, **kw):
+    return "timezone('UTC', now())"
 
 
 # (IMPORTANT) This table is mandatory for Replit Auth, don't drop it.
@@ -15,10 +33,10 @@ class User(UserMixin, db.Model):
     last_name = db.Column(db.String, nullable=True)
     profile_image_url = db.Column(db.String, nullable=True)
 
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
     updated_at = db.Column(db.DateTime,
-                           default=datetime.now,
-                           onupdate=datetime.now)
+                           server_default=utcnow(),
+                           onupdate=utcnow())
 
 # (IMPORTANT) This table is mandatory for Replit Auth, don't drop it.
 class OAuth(OAuthConsumerMixin, db.Model):
@@ -41,6 +59,38 @@ class Translation(db.Model):
     original_text = db.Column(db.Text, nullable=False)
     translated_text = db.Column(db.Text, nullable=False)
     service_used = db.Column(db.String, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
     
-    user = db.relationship(User, backref='translations')
\ No newline at end of file
+    # Lazy loads of User.translations raise, so history pages can't fall into N+1 queries
+    user = db.relationship(User, backref=db.backref('translations', lazy='raise'))
+
+    # Matches the history query: a user's translations, newest first
+    __table_args__ = (db.Index(
+        'ix_translations_user_created',
+        user_id,
+        created_at.desc(),
+    ),)
+
+# Latest translations for a user, with the user eagerly loaded, built once
+# and reused by the history page
+RECENT_TRANSLATIONS = (
+    select(Translation)
+    .options(joinedload(Translation.user))
+    .where(Translation.user_id == bindparam('uid'))
+    .order_by(Translation.created_at.desc())
+    .limit(50)
+)
+
+# create_all() never alters tables that already exist, so init-db also runs
+# these idempotent statements to bring older Postgres databases up to date
+SCHEMA_UPGRADES = [
+    "ALTER TABLE users ALTER COLUMN created_at SET DEFAULT timezone('UTC', now()), "
+    "ALTER COLUMN updated_at SET DEFAULT timezone('UTC', now())",
+    "ALTER TABLE translations ALTER COLUMN created_at SET DEFAULT timezone('UTC', now())",
+]
+
+# Indexes for existing tables are built CONCURRENTLY so history inserts aren't
+# blocked while they build; this can't run inside a transaction block
+SCHEMA_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_translations_user_created ON translations (user_id, created_at DESC)",
+]
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+# app.py reads its configuration at import time
+os.environ.setdefault('REPL_ID', 'test-repl')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
+# Always a throwaway database: the database fixture drops every table
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import app as translator_app  # noqa: E402
+
+
+@pytest.fixture
+def app_module():
+    """The app module with a clean translation cache and closed circuit breakers"""
+    translator_app.TRANSLATION_CACHE.clear()
+    yield translator_app
+    translator_app.TRANSLATION_CACHE.clear()
+    translator_app.MYMEMORY_BREAKER.close()
+    translator_app.LIBRE_BREAKER.close()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def database(app_module):
+    """Fresh tables in the test database, inside an app context"""
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        yield app_module.db
+        app_module.db.session.remove()
+        app_module.db.drop_all()
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from models import Translation
+
+
+def history_row(i, user_id=None):
+    return {
+        'user_id': user_id,
+        'original_text': f'hello {i}',
+        'translated_text': f'নমস্কাৰ {i}',
+        'service_used': 'MyMemory',
+    }
+
+
+def test_write_history_inserts_rows_with_database_timestamps(app_module, database):
+    app_module.write_history([history_row(i) for i in range(3)])
+
+    rows = database.session.execute(database.select(Translation)).scalars().all()
+    assert [row.original_text for row in rows] == ['hello 0', 'hello 1', 'hello 2']
+    assert all(row.created_at is not None for row in rows)
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def saved_rows(database):
+    database.session.expire_all()
+    return database.session.execute(database.select(Translation).order_by(Translation.id)).scalars().all()
+
+
+@pytest.fixture
+def recorded_batches(app_module, monkeypatch):
+    batches = []
+    monkeypatch.setattr(app_module, 'write_history', batches.append)
+    return batches
+
+
+def test_writer_flushes_full_batches(app_module, recorded_batches):
+    for i in range(120):
+        app_module.HISTORY_QUEUE.put(history_row(i))
+
+    assert wait_for(lambda: sum(map(len, recorded_batches)) == 120)
+    assert max(map(len, recorded_batches)) == app_module.HISTORY_BATCH_SIZE
+    assert [row['original_text'] for batch in recorded_batches for row in batch] == [f'hello {i}' for i in range(120)]
+
+
+def test_writer_flushes_a_partial_batch_after_the_interval(app_module, recorded_batches):
+    app_module.HISTORY_QUEUE.put(history_row(0))
+
+    assert wait_for(lambda: recorded_batches, timeout=app_module.HISTORY_FLUSH_INTERVAL + 0.5)
+    assert recorded_batches == [[history_row(0)]]
+
+
+def test_failed_batch_is_rolled_back(app_module, database):
+    app_module.write_history([history_row(0), dict(history_row(1), original_text=None)])
+    app_module.write_history([history_row(2)])
+
+    assert [row.original_text for row in saved_rows(database)] == ['hello 2']
+
+
+def test_flush_history_writes_queued_and_in_flight_rows(app_module, database, monkeypatch):
+    # A long interval keeps the first rows sitting in the writer's own batch
+    monkeypatch.setattr(app_module, 'HISTORY_FLUSH_INTERVAL', 5)
+    try:
+        app_module.HISTORY_QUEUE.put(history_row(0))
+        assert wait_for(app_module.HISTORY_QUEUE.empty)
+        app_module.HISTORY_QUEUE.put(history_row(1))
+
+        started = time.monotonic()
+        app_module.flush_history()
+
+        assert time.monotonic() - started < 1
+        assert not app_module.HISTORY_WRITER.is_alive()
+        assert [row.original_text for row in saved_rows(database)] == ['hello 0', 'hello 1']
+    finally:
+        app_module.start_history_writer()
+
+
+def test_recent_translations_loads_users_in_one_query(app_module, database):
+    from datetime import datetime, timedelta
+
+    import sqlalchemy
+    from models import RECENT_TRANSLATIONS, User
+
+    database.session.add_all([User(id='u1', first_name='Asha'), User(id='u2', first_name='Bina')])
+    start = datetime(2025, 1, 1)
+    database.session.add_all(
+        [Translation(created_at=start + timedelta(minutes=i), **history_row(i, 'u1')) for i in range(60)]
+        + [Translation(created_at=start, **history_row('other', 'u2'))]
+    )
+    database.session.commit()
+    database.session.expunge_all()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sqlalchemy.event.listen(database.engine, 'before_cursor_execute', record)
+    try:
+        translations = database.session.execute(RECENT_TRANSLATIONS, {'uid': 'u1'}).scalars().all()
+        names = {t.user.first_name for t in translations}
+    finally:
+        sqlalchemy.event.remove(database.engine, 'before_cursor_execute', record)
+
+    assert len(statements) == 1
+    assert names == {'Asha'}
+    assert [t.original_text for t in translations] == [f'hello {i}' for i in range(59, 9, -1)]
+
+
+def test_lazy_loading_user_translations_raises(database):
+    import sqlalchemy
+    from models import User
+
+    database.session.add(User(id='u1'))
+    database.session.commit()
+    user = database.session.get(User, 'u1')
+
+    with pytest.raises(sqlalchemy.exc.InvalidRequestError):
+        user.translations
@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+
+def test_timestamps_default_to_utc_on_the_database(app_module):
+    from models import Translation, User
+
+    for table in (Translation.__table__, User.__table__):
+        ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+        assert "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('UTC', now())" in ddl
+
+
+def test_schema_upgrades_match_the_models(app_module):
+    from models import SCHEMA_INDEXES, Translation
+
+    (index,) = Translation.__table__.indexes
+    created = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+    assert created.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY IF NOT EXISTS') in SCHEMA_INDEXES
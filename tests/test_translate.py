@@ -0,0 +1,313 @@
+import threading
+import time
+
+import orjson
+import pytest
+import requests
+
+
+def json_response(payload, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = orjson.dumps(payload)
+    return response
+
+
+def fail(exc):
+    def request(*args, **kwargs):
+        raise exc
+    return request
+
+
+def test_open_breaker_lets_provider_back_in_after_reset_timeout(app_module, monkeypatch):
+    breaker = app_module.MYMEMORY_BREAKER
+    monkeypatch.setattr(breaker, 'reset_timeout', 0.2)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(kwargs['params']['q'])
+        raise requests.exceptions.ConnectionError('down')
+
+    monkeypatch.setattr(app_module.SESSION, 'get', get)
+    for i in range(breaker.fail_max):
+        try:
+            app_module.race_providers(f'trip {i}')
+        except requests.exceptions.RequestException:
+            pass
+    assert breaker.current_state == 'open'
+
+    # Still within reset_timeout: the breaker rejects the call without going upstream
+    calls.clear()
+    app_module.race_providers('while open')
+    assert calls == []
+
+    time.sleep(0.3)
+
+    def get_ok(*args, **kwargs):
+        calls.append(kwargs['params']['q'])
+        return json_response({'responseStatus': 200, 'responseData': {'translatedText': 'নমস্কাৰ'}})
+
+    monkeypatch.setattr(app_module.SESSION, 'get', get_ok)
+    assert app_module.race_providers('hello') == ('নমস্কাৰ', 'MyMemory')
+    assert calls == ['hello']
+    assert breaker.current_state == 'closed'
+
+
+def test_losing_provider_does_not_block_the_winner(app_module, monkeypatch):
+    def slow_post(*args, **kwargs):
+        time.sleep(1)
+        return json_response({'translatedText': 'too late'})
+
+    monkeypatch.setattr(app_module.SESSION, 'post', slow_post)
+    monkeypatch.setattr(app_module.SESSION, 'get', lambda *args, **kwargs: json_response(
+        {'responseStatus': 200, 'responseData': {'translatedText': 'নমস্কাৰ'}}))
+
+    started = time.monotonic()
+    assert app_module.race_providers('hello') == ('নমস্কাৰ', 'MyMemory')
+    assert time.monotonic() - started < 1
+
+
+def test_translate_returns_504_when_every_provider_times_out(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.SESSION, 'get', fail(requests.exceptions.ReadTimeout('slow')))
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ReadTimeout('slow')))
+
+    response = client.post('/translate', json={'text': 'hello'})
+
+    assert response.status_code == 504
+    assert response.get_json()['success'] is False
+
+
+def test_retry_after_is_capped(app_module):
+    from urllib3 import HTTPResponse
+
+    response = HTTPResponse(status=429, headers={'Retry-After': '120'})
+
+    assert app_module.RETRY.get_retry_after(response) == app_module.RETRY_AFTER_MAX
+
+
+def test_read_timeouts_are_not_retried(app_module):
+    from urllib3.exceptions import ReadTimeoutError
+
+    with pytest.raises(ReadTimeoutError):
+        app_module.RETRY.increment(method='POST', url='/translate', error=ReadTimeoutError(None, '/translate', 'slow'))
+
+
+def test_provider_calls_run_concurrently(app_module, monkeypatch):
+    def slow_get(*args, **kwargs):
+        time.sleep(0.5)
+        return json_response({'responseStatus': 200, 'responseData': {'translatedText': kwargs['params']['q'].upper()}})
+
+    monkeypatch.setattr(app_module.SESSION, 'get', slow_get)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+
+    started = time.monotonic()
+    futures = [app_module.EXECUTOR.submit(app_module.race_providers, f'text {i}') for i in range(12)]
+
+    assert [future.result()[0] for future in futures] == [f'TEXT {i}' for i in range(12)]
+    assert time.monotonic() - started < 2
+
+
+LONG_TEXT = '\n\n'.join(
+    ' '.join(f'Paragraph {p} sentence {s} has a few more words in it.' for s in range(12))
+    for p in range(6)
+) + '\nLast line without punctuation'
+
+
+def echo_upper(*args, **kwargs):
+    text = kwargs['params']['q']
+    return json_response({'responseStatus': 200, 'responseData': {'translatedText': text.upper()}})
+
+
+def test_split_into_chunks_keeps_original_separators(app_module):
+    chunks = app_module.split_into_chunks(LONG_TEXT)
+
+    assert all(len(chunk) <= app_module.CHUNK_LENGTH for chunk, _ in chunks)
+    assert all('\n' not in chunk for chunk, _ in chunks)
+    assert ''.join(chunk + separator for chunk, separator in chunks) == LONG_TEXT
+
+
+def test_split_into_chunks_breaks_overlong_sentences(app_module):
+    text = ' '.join(['word'] * 300) + ' ' + 'x' * 1200
+
+    chunks = app_module.split_into_chunks(text)
+
+    assert all(len(chunk) <= app_module.CHUNK_LENGTH for chunk, _ in chunks)
+    assert ''.join(chunk + separator for chunk, separator in chunks) == text
+
+
+def test_long_text_is_translated_in_chunks_with_layout_preserved(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.SESSION, 'get', echo_upper)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+
+    assert app_module.translate_text(LONG_TEXT) == (LONG_TEXT.upper(), 'MyMemory')
+
+
+def test_all_chunks_share_one_deadline(app_module, monkeypatch):
+    # Every chunk waits on a slow upstream at the same time; none should time out in a queue
+    monkeypatch.setattr(app_module, 'PROVIDER_TIMEOUT', 1)
+
+    def slow_echo(*args, **kwargs):
+        time.sleep(0.5)
+        return echo_upper(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.SESSION, 'get', slow_echo)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+    text = ' '.join(f'Sentence number {i} is here to pad the text out a bit.' for i in range(90))
+    assert len(app_module.split_into_chunks(text)) >= 8
+
+    assert app_module.translate_text(text)[0] == text.upper()
+
+
+def test_chunk_without_translation_is_retried_within_the_deadline(app_module, monkeypatch):
+    attempts = {}
+
+    def flaky(*args, **kwargs):
+        text = kwargs['params']['q']
+        attempts[text] = attempts.get(text, 0) + 1
+        if attempts[text] == 1 and text.startswith('Paragraph 3'):
+            return json_response({'responseStatus': 403}, status_code=403)
+        return echo_upper(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.SESSION, 'get', flaky)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+
+    assert app_module.translate_text(LONG_TEXT)[0] == LONG_TEXT.upper()
+    assert max(attempts.values()) == 2
+
+
+def test_timed_out_chunks_are_not_retried_past_the_deadline(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROVIDER_TIMEOUT', 0.5)
+    calls = []
+    release = threading.Event()
+
+    def hang(*args, **kwargs):
+        calls.append(1)
+        release.wait(5)
+        raise requests.exceptions.ReadTimeout('slow')
+
+    monkeypatch.setattr(app_module.SESSION, 'get', hang)
+    monkeypatch.setattr(app_module.SESSION, 'post', hang)
+    chunk_count = len(app_module.split_into_chunks(LONG_TEXT))
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        app_module.translate_text(LONG_TEXT)
+
+    elapsed = time.monotonic() - started
+    # Let the abandoned calls finish before the fixture resets the breakers
+    release.set()
+    time.sleep(0.1)
+
+    assert elapsed < 0.8
+    assert len(calls) == 2 * chunk_count
+
+
+def test_half_open_breaker_lets_exactly_one_trial_call_through(app_module, monkeypatch):
+    breaker = app_module.MYMEMORY_BREAKER
+    monkeypatch.setattr(breaker, 'reset_timeout', 0.1)
+    calls = []
+
+    def still_down(*args, **kwargs):
+        calls.append(kwargs['params']['q'])
+        time.sleep(0.3)
+        raise requests.exceptions.ConnectionError('down')
+
+    monkeypatch.setattr(app_module.SESSION, 'get', still_down)
+    breaker.open()
+    time.sleep(0.2)
+
+    futures = [
+        app_module.EXECUTOR.submit(app_module.call_provider, 'MyMemory', app_module.translate_with_mymemory, f'text {i}')
+        for i in range(50)
+    ]
+    for future in futures:
+        try:
+            future.result()
+        except requests.exceptions.RequestException:
+            pass
+
+    assert len(calls) == 1
+    assert breaker.current_state == 'open'
+
+
+def test_call_that_trips_the_breakers_still_returns_504(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.SESSION, 'get', fail(requests.exceptions.ReadTimeout('slow')))
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ReadTimeout('slow')))
+
+    for i in range(app_module.MYMEMORY_BREAKER.fail_max):
+        response = client.post('/translate', json={'text': f'hello {i}'})
+        assert response.status_code == 504
+
+    assert app_module.MYMEMORY_BREAKER.current_state == 'open'
+    assert app_module.LIBRE_BREAKER.current_state == 'open'
+
+
+def test_upstream_keepalive_pool_is_bounded(app_module):
+    adapter = app_module.SESSION.get_adapter(app_module.MYMEMORY_API_URL)
+
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == app_module.KEEPALIVE_CONNECTIONS
+    assert adapter.poolmanager.connection_pool_kw['block'] is False
+
+
+def test_user_loader_failure_returns_json_error(client, app_module, monkeypatch):
+    class BrokenUser:
+        def _get_current_object(self):
+            raise RuntimeError('database is down')
+
+    monkeypatch.setattr(app_module, 'current_user', BrokenUser())
+
+    response = client.post('/translate', json={'text': 'hello'})
+
+    assert response.status_code == 500
+    assert response.get_json()['success'] is False
+
+
+def test_repeated_text_is_served_from_the_cache(app_module, monkeypatch):
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(kwargs['params']['q'])
+        return echo_upper(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.SESSION, 'get', get)
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+
+    assert app_module.race_providers('hello') == ('HELLO', 'MyMemory')
+    assert app_module.race_providers('hello') == ('HELLO', 'MyMemory')
+    assert app_module.race_providers('Hello') == ('HELLO', 'MyMemory')
+    assert calls == ['hello', 'Hello']
+
+
+def test_failed_translation_is_not_cached(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.SESSION, 'get', lambda *args, **kwargs: json_response({'responseStatus': 403}, 403))
+    monkeypatch.setattr(app_module.SESSION, 'post', lambda *args, **kwargs: json_response({}, 400))
+
+    assert app_module.race_providers('hello') == (None, None)
+    assert len(app_module.TRANSLATION_CACHE) == 0
+
+
+def test_json_goes_through_orjson(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.SESSION, 'get', lambda *args, **kwargs: json_response(
+        {'responseStatus': 200, 'responseData': {'translatedText': 'নমস্কাৰ'}}))
+    monkeypatch.setattr(app_module.SESSION, 'post', fail(requests.exceptions.ConnectionError('down')))
+
+    response = client.post('/translate', data=orjson.dumps({'text': 'hello'}), content_type='application/json')
+
+    assert isinstance(app_module.app.json, app_module.OrjsonProvider)
+    assert response.mimetype == 'application/json'
+    assert orjson.loads(response.data) == {
+        'success': True,
+        'translated_text': 'নমস্কাৰ',
+        'original_text': 'hello',
+        'service': 'MyMemory',
+    }
+    # orjson writes non-ASCII text as UTF-8 rather than \u escapes
+    assert 'নমস্কাৰ'.encode('utf-8') in response.data
+
+
+def test_malformed_request_json_returns_json_error(client):
+    response = client.post('/translate', data=b'{not json', content_type='application/json')
+
+    assert response.status_code == 500
+    assert response.get_json()['success'] is False